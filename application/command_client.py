@@ -0,0 +1,255 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from itertools import count
+from random import randrange, sample
+from typing import Any, Dict, List, Optional
+
+import constants as const
+
+
+class CommandClient:
+    """Client of the command server which can pipeline batches of commands without waiting for responses"""
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        process: Optional[asyncio.subprocess.Process] = None
+    ):
+        self.__reader = reader
+        self.__writer = writer
+        self.__process = process
+        self.__command_ids = count()
+
+    @classmethod
+    async def connect_unix(cls, path: str) -> "CommandClient":
+        reader, writer = await asyncio.open_unix_connection(path, limit=1 << 24)
+
+        return cls(reader, writer)
+
+    @classmethod
+    async def spawn_stdio(cls) -> "CommandClient":
+        """Starts the server as a subprocess and talks to it through its stdin and stdout"""
+        server_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "command_server.py")
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, server_path, "--stdio",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=1 << 24,
+        )
+
+        # pipes are always created when PIPE is passed
+        assert process.stdout is not None and process.stdin is not None
+
+        return cls(process.stdout, process.stdin, process)
+
+    def command(self, op: str, **args: Any) -> Dict[str, Any]:
+        """Creates a command with a unique id"""
+        return {"id": next(self.__command_ids), "op": op, **args}
+
+    def send_batch(self, commands: List[Dict[str, Any]]) -> None:
+        """Sends the batch without waiting for the response"""
+        self.__writer.write(json.dumps(commands, separators=(",", ":")).encode() + b"\n")
+
+    async def receive_batch(self) -> List[Dict[str, Any]]:
+        """Receives responses for the oldest batch which was sent"""
+        line = await self.__reader.readline()
+
+        if not line:
+            raise ConnectionError("server closed the connection")
+
+        return json.loads(line)
+
+    async def execute_batch(self, commands: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        self.send_batch(commands)
+        await self.__writer.drain()
+
+        return await self.receive_batch()
+
+    async def execute(self, op: str, **args: Any) -> Dict[str, Any]:
+        responses = await self.execute_batch([self.command(op, **args)])
+
+        return responses[0]
+
+    async def pipeline(self, batches: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Sends all batches while concurrently receiving their responses"""
+        async def send() -> None:
+            for batch in batches:
+                self.send_batch(batch)
+                await self.__writer.drain()
+
+        async def receive() -> List[Dict[str, Any]]:
+            responses = []
+            for _ in batches:
+                responses.extend(await self.receive_batch())
+
+            return responses
+
+        _, responses = await asyncio.gather(send(), receive())
+
+        return responses
+
+    async def close(self) -> None:
+        self.__writer.close()
+
+        if self.__process is not None:
+            await self.__process.wait()
+
+
+def split_into_batches(commands: List[Dict[str, Any]], batch_size: int) -> List[List[Dict[str, Any]]]:
+    return [commands[i:i + batch_size] for i in range(0, len(commands), batch_size)]
+
+
+async def measure(
+    title: str,
+    client: CommandClient,
+    commands: List[Dict[str, Any]],
+    batch_size: int
+) -> List[Dict[str, Any]]:
+    """Pipelines commands to the server and prints throughput"""
+    start = time.perf_counter()
+    responses = await client.pipeline(split_into_batches(commands, batch_size))
+    elapsed = time.perf_counter() - start
+
+    failed = sum(1 for response in responses if not response["ok"])
+    print(f"{title}: {len(commands)} ops in {elapsed:.3f}s, {len(commands) / elapsed:.0f} ops/s, {failed} failed")
+
+    return responses
+
+
+async def run_smoke_test(client: CommandClient) -> None:
+    """Checks every command once and fails loudly if a response is not what expected"""
+    first = await client.execute(const.CommandType.CREATE_RECT, x=100, y=100)
+    second = await client.execute(const.CommandType.CREATE_RECT, x=300, y=100)
+    assert first["ok"] and second["ok"], (first, second)
+
+    blocked = await client.execute(const.CommandType.CREATE_RECT, x=110, y=100)
+    assert blocked["ok"] and blocked["result"] is None, blocked
+
+    first_id, second_id = first["result"]["id"], second["result"]["id"]
+
+    # second rectangle stops before the first one instead of intersecting it
+    moved = await client.execute(const.CommandType.MOVE_RECT, rect_id=second_id, x=100, y=110)
+    assert moved["ok"] and moved["result"]["x"] >= first["result"]["x"] + const.RECT_WIDTH, moved
+    assert moved["result"]["x"] < second["result"]["x"], moved
+
+    link = await client.execute(const.CommandType.LINK, first_rect_id=first_id, second_rect_id=second_id)
+    assert link["ok"] and link["result"] is not None, link
+
+    query = await client.execute(const.CommandType.QUERY_REGION, x=0, y=0, width=400, height=200)
+    assert query["ok"] and {r["id"] for r in query["result"]} == {first_id, second_id}, query
+
+    component = await client.execute(const.CommandType.COMPONENT, rect_id=first_id)
+    assert component["ok"] and set(component["result"]) == {first_id, second_id}, component
+
+    # linked rectangles are moved together
+    moved_component = await client.execute(const.CommandType.MOVE_COMPONENT, rect_id=first_id, x=100, y=300)
+    assert moved_component["ok"] and moved_component["result"]["y"] > first["result"]["y"], moved_component
+
+    query = await client.execute(const.CommandType.QUERY_REGION, x=0, y=0, width=400, height=200)
+    assert query["ok"] and query["result"] == [], query
+
+    # snapshot is written into a temporary directory so the test does not leave files behind
+    with tempfile.TemporaryDirectory() as directory:
+        save_path = os.path.join(directory, "scene_snapshot.json")
+        saved = await client.execute(const.CommandType.SAVE, path=save_path)
+        assert saved["ok"] and saved["result"]["reference_lines"] == 1, saved
+
+        with open(save_path, encoding="utf-8") as file:
+            snapshot = json.load(file)
+
+        assert {r["id"] for r in snapshot["rectangles"]} == {first_id, second_id}, snapshot
+
+    unlink = await client.execute(const.CommandType.UNLINK, line_id=link["result"])
+    assert unlink["ok"] and unlink["result"] is True, unlink
+
+    unknown = await client.execute(const.CommandType.MOVE_RECT, rect_id="unknown", x=0, y=0)
+    assert not unknown["ok"], unknown
+
+    print("smoke test passed")
+
+
+async def run_load(client: CommandClient, op_count: int, batch_size: int) -> None:
+    """Fills the scene with a grid of rectangles and pipelines a random mix of commands"""
+    step_x, step_y = const.RECT_WIDTH + const.RECT_WIDTH // 3, const.RECT_HEIGHT + const.RECT_HEIGHT // 3
+
+    create_commands = [
+        client.command(const.CommandType.CREATE_RECT, x=x, y=y)
+        for x in range(const.RECT_WIDTH // 2, const.WINDOW_WIDTH - const.RECT_WIDTH // 2, step_x)
+        for y in range(const.RECT_HEIGHT // 2, const.WINDOW_HEIGHT - const.RECT_HEIGHT // 2, step_y)
+    ]
+    responses = await measure("create_rect", client, create_commands, batch_size)
+
+    # rectangles are moved around the place where they were created like with short drags
+    centers = {
+        response["result"]["id"]: (command["x"], command["y"])
+        for command, response in zip(create_commands, responses) if response["ok"] and response["result"]
+    }
+    rect_ids = list(centers.keys())
+
+    commands = []
+    for i in range(op_count):
+        kind = i % 3
+
+        if kind == 0:
+            rect_id = rect_ids[randrange(len(rect_ids))]
+            x, y = centers[rect_id]
+            commands.append(client.command(
+                const.CommandType.MOVE_RECT,
+                rect_id=rect_id,
+                x=x + randrange(-const.RECT_HEIGHT, const.RECT_HEIGHT),
+                y=y + randrange(-const.RECT_HEIGHT, const.RECT_HEIGHT),
+            ))
+        elif kind == 1:
+            first_rect_id, second_rect_id = sample(rect_ids, 2)
+            commands.append(client.command(
+                const.CommandType.LINK,
+                first_rect_id=first_rect_id,
+                second_rect_id=second_rect_id,
+            ))
+        else:
+            commands.append(client.command(
+                const.CommandType.QUERY_REGION,
+                x=randrange(const.WINDOW_WIDTH),
+                y=randrange(const.WINDOW_HEIGHT),
+                width=const.RECT_WIDTH * 2,
+                height=const.RECT_HEIGHT * 2,
+            ))
+
+    responses = await measure("move_rect/link/query_region", client, commands, batch_size)
+    line_ids = [
+        response["result"] for command, response in zip(commands, responses)
+        if command["op"] == const.CommandType.LINK and response["ok"] and response["result"]
+    ]
+
+    unlink_commands = [client.command(const.CommandType.UNLINK, line_id=line_id) for line_id in line_ids]
+    await measure("unlink", client, unlink_commands, batch_size)
+
+
+async def main(args: argparse.Namespace) -> None:
+    if args.socket:
+        client = await CommandClient.connect_unix(args.socket)
+    else:
+        client = await CommandClient.spawn_stdio()
+
+    try:
+        if args.smoke:
+            await run_smoke_test(client)
+        else:
+            await run_load(client, args.ops, args.batch)
+    finally:
+        await client.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Test client and load generator for the command server")
+    parser.add_argument("--socket", help="path of the server unix socket, server is spawned over stdio if omitted")
+    parser.add_argument("--smoke", action="store_true", help="run every command once and check responses")
+    parser.add_argument("--ops", type=int, default=100000, help="amount of commands sent by the load generator")
+    parser.add_argument("--batch", type=int, default=1000, help="amount of commands in one batch")
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,312 @@
+import argparse
+import asyncio
+import json
+import sys
+import traceback
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from PyQt6.QtCore import QPoint, QRect
+
+import constants as const
+from custom_types import RectDataT
+from scene import Scene
+from snapshot import SceneSnapshot
+
+# json value returned by a command, save returns it asynchronously because the file is written outside the event loop
+ResultT = Union[None, bool, str, List[Any], Dict[str, Any], Awaitable[Dict[str, Any]]]
+ResponseT = Union[Dict[str, Any], Awaitable[Dict[str, Any]]]
+
+# coordinates and sizes are limited so that their sums still fit into the int of Qt geometry
+COORDINATE_LIMIT = 1 << 30
+
+
+class CommandError(Exception):
+    """Error of a single command which is sent back to the client instead of closing the connection"""
+
+
+def get_int_argument(command: Dict[str, Any], key: str) -> int:
+    """Reads an integer argument of the command which can be used as a coordinate or a size"""
+    value = command[key]
+
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise CommandError(f"argument {key} should be a number")
+
+    try:
+        value = int(value)
+    except (ValueError, OverflowError):
+        raise CommandError(f"argument {key} should be a finite number")
+
+    if not -COORDINATE_LIMIT <= value <= COORDINATE_LIMIT:
+        raise CommandError(f"argument {key} is out of range")
+
+    return value
+
+
+def get_str_argument(command: Dict[str, Any], key: str) -> str:
+    value = command[key]
+
+    if not isinstance(value, str):
+        raise CommandError(f"argument {key} should be a string")
+
+    return value
+
+
+def rect_to_dict(rect_data: RectDataT) -> Dict[str, Any]:
+    rect = rect_data["rect"]
+
+    return {"id": rect_data["id"], "x": rect.x(), "y": rect.y(), "width": rect.width(), "height": rect.height()}
+
+
+def snapshot_to_dict(snapshot: SceneSnapshot) -> Dict[str, Any]:
+    return {
+        "version": snapshot.version,
+        "rectangles": [r._asdict() for r in snapshot.rectangles],
+        "reference_lines": [line._asdict() for line in snapshot.reference_lines],
+    }
+
+
+def write_snapshot(snapshot: SceneSnapshot, path: str) -> Dict[str, Any]:
+    """Writes the snapshot into the json file, snapshot is immutable so it is safe to call from any thread"""
+    data = snapshot_to_dict(snapshot)
+
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(data, file)
+
+    return {
+        "path": path,
+        "version": data["version"],
+        "rectangles": len(data["rectangles"]),
+        "reference_lines": len(data["reference_lines"]),
+    }
+
+
+def encode(response: Union[Dict[str, Any], List[Dict[str, Any]]]) -> bytes:
+    return json.dumps(response, separators=(",", ":")).encode() + b"\n"
+
+
+class CommandServer:
+    """
+    Headless server which applies line-delimited json commands to the scene.
+
+    Every line is a command object like {"id": 1, "op": "create_rect", "x": 100, "y": 100}
+    or a json array of such objects, the response is a line with an object or an array of objects respectively.
+    Points of create_rect and move_rect are centers of the rectangle like for mouse actions.
+    All complete lines received at once are applied without yielding to other clients,
+    rectangles moved by them are updated into the spatial index once at the end
+    and their responses are streamed back with a single write
+    """
+    def __init__(self, scene: Scene):
+        self.__scene = scene
+        self.__handlers: Dict[str, Callable[[Dict[str, Any]], ResultT]] = {
+            const.CommandType.CREATE_RECT: self.__create_rect,
+            const.CommandType.MOVE_RECT: self.__move_rect,
+            const.CommandType.LINK: self.__link,
+            const.CommandType.UNLINK: self.__unlink,
+            const.CommandType.QUERY_REGION: self.__query_region,
+            const.CommandType.MOVE_COMPONENT: self.__move_component,
+            const.CommandType.COMPONENT: self.__component,
+            const.CommandType.SAVE: self.__save,
+        }
+
+    def __create_rect(self, command: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        rect_id = self.__scene.create_rect(QPoint(get_int_argument(command, "x"), get_int_argument(command, "y")))
+        rect_data = self.__scene.get_rect(rect_id) if rect_id is not None else None
+
+        if rect_data is None:
+            return None
+
+        return rect_to_dict(rect_data)
+
+    def __move_rect(self, command: Dict[str, Any]) -> Dict[str, Any]:
+        point = QPoint(get_int_argument(command, "x"), get_int_argument(command, "y"))
+        rect_data = self.__scene.move_rect(get_str_argument(command, "rect_id"), point)
+
+        if rect_data is None:
+            raise CommandError(f"unknown rect {command['rect_id']}")
+
+        return rect_to_dict(rect_data)
+
+    def __link(self, command: Dict[str, Any]) -> Optional[str]:
+        first_rect_id = get_str_argument(command, "first_rect_id")
+        second_rect_id = get_str_argument(command, "second_rect_id")
+
+        return self.__scene.link_rects(first_rect_id, second_rect_id)
+
+    def __unlink(self, command: Dict[str, Any]) -> bool:
+        return self.__scene.unlink_rects(get_str_argument(command, "line_id"))
+
+    def __query_region(self, command: Dict[str, Any]) -> List[Dict[str, Any]]:
+        range_rect = QRect(
+            get_int_argument(command, "x"),
+            get_int_argument(command, "y"),
+            get_int_argument(command, "width"),
+            get_int_argument(command, "height"),
+        )
+
+        return list(map(rect_to_dict, self.__scene.query_region(range_rect)))
+
+    def __move_component(self, command: Dict[str, Any]) -> Dict[str, Any]:
+        point = QPoint(get_int_argument(command, "x"), get_int_argument(command, "y"))
+        rect_data = self.__scene.move_component(get_str_argument(command, "rect_id"), point)
+
+        if rect_data is None:
+            raise CommandError(f"unknown rect {command['rect_id']}")
+
+        return rect_to_dict(rect_data)
+
+    def __component(self, command: Dict[str, Any]) -> List[str]:
+        rect_id = get_str_argument(command, "rect_id")
+
+        if self.__scene.get_rect(rect_id) is None:
+            raise CommandError(f"unknown rect {rect_id}")
+
+        return list(self.__scene.get_component(rect_id))
+
+    def __save(self, command: Dict[str, Any]) -> Awaitable[Dict[str, Any]]:
+        path = get_str_argument(command, "path")
+
+        # snapshot is taken in order with other commands, but written to the disk outside the event loop
+        snapshot = self.__scene.take_snapshot()
+        loop = asyncio.get_running_loop()
+
+        return loop.run_in_executor(None, write_snapshot, snapshot, path)
+
+    def execute(self, command: Any) -> ResponseT:
+        """Applies a single command to the scene"""
+        if not isinstance(command, dict):
+            return {"id": None, "ok": False, "error": "command should be an object"}
+
+        command_id = command.get("id")
+        op = command.get("op")
+        handler = self.__handlers.get(op) if isinstance(op, str) else None
+
+        if handler is None:
+            return {"id": command_id, "ok": False, "error": f"unknown op {op}"}
+
+        try:
+            result = handler(command)
+        except KeyError as error:
+            return {"id": command_id, "ok": False, "error": f"missing argument {error.args[0]}"}
+        except (CommandError, TypeError, ValueError, OverflowError) as error:
+            return {"id": command_id, "ok": False, "error": str(error)}
+
+        if isinstance(result, asyncio.Future):
+            return self.__wait_result(command_id, result)
+
+        return {"id": command_id, "ok": True, "result": result}
+
+    async def __wait_result(self, command_id: Any, result: Awaitable[Any]) -> Dict[str, Any]:
+        try:
+            return {"id": command_id, "ok": True, "result": await result}
+        except OSError as error:
+            return {"id": command_id, "ok": False, "error": str(error)}
+
+    async def execute_lines(self, lines: List[bytes]) -> bytes:
+        """Applies all commands from the lines in one pass and returns encoded responses"""
+        responses: List[Union[ResponseT, List[ResponseT]]] = []
+
+        for line in lines:
+            if not line.strip():
+                continue
+
+            try:
+                request = json.loads(line)
+            except ValueError as error:
+                responses.append({"id": None, "ok": False, "error": f"invalid json: {error}"})
+                continue
+
+            if isinstance(request, list):
+                responses.append([self.execute(command) for command in request])
+            else:
+                responses.append(self.execute(request))
+
+        # moved rectangles are updated into the spatial index once for the whole batch
+        self.__scene.update_index()
+
+        # wait for commands which finish outside the event loop keeping the order of responses
+        output = []
+        for response in responses:
+            if isinstance(response, list):
+                output.append(encode([await self.__resolve(r) for r in response]))
+            else:
+                output.append(encode(await self.__resolve(response)))
+
+        return b"".join(output)
+
+    async def __resolve(self, response: ResponseT) -> Dict[str, Any]:
+        if isinstance(response, dict):
+            return response
+
+        return await response
+
+    async def __execute_lines_safely(self, lines: List[bytes]) -> bytes:
+        """Applies commands from the lines, an unexpected error is sent back instead of closing the connection"""
+        try:
+            return await self.execute_lines(lines)
+        except Exception as error:
+            traceback.print_exc()
+            return encode({"id": None, "ok": False, "error": f"internal error: {error!r}"})
+
+    async def handle_stream(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Reads pipelined commands from the stream until it is closed"""
+        buffer = b""
+
+        try:
+            while True:
+                chunk = await reader.read(const.COMMAND_READ_CHUNK_SIZE)
+
+                if not chunk:
+                    break
+
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+
+                if lines:
+                    writer.write(await self.__execute_lines_safely(lines))
+                    await writer.drain()
+
+            # the last command could be sent without trailing new line
+            if buffer.strip():
+                writer.write(await self.__execute_lines_safely([buffer]))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve_unix(self, path: str) -> None:
+        """Serves clients connected to the unix socket"""
+        server = await asyncio.start_unix_server(self.handle_stream, path)
+
+        async with server:
+            await server.serve_forever()
+
+    async def serve_stdio(self) -> None:
+        """Serves a single client through stdin and stdout"""
+        loop = asyncio.get_running_loop()
+
+        reader = asyncio.StreamReader(limit=const.COMMAND_READ_CHUNK_SIZE)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin.buffer)
+
+        transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, sys.stdout.buffer)
+        writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+
+        await self.handle_stream(reader, writer)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Headless server applying json commands to the scene")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--socket", help="path of the unix socket to listen on")
+    group.add_argument("--stdio", action="store_true", help="read commands from stdin and write responses to stdout")
+    args = parser.parse_args()
+
+    command_server = CommandServer(Scene(const.WINDOW_WIDTH, const.WINDOW_HEIGHT))
+
+    try:
+        if args.stdio:
+            asyncio.run(command_server.serve_stdio())
+        else:
+            asyncio.run(command_server.serve_unix(args.socket))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,132 @@
+from collections import deque
+from itertools import count
+from typing import Deque, Dict, FrozenSet, Optional, Set
+
+
+class ConnectivityIndex:
+    """
+    Incremental index of connected components of the graph where rectangles are vertices
+    and reference lines are edges.
+
+    Every rectangle is labeled with id of its component and every component keeps the set of its members.
+    Linking merges the smaller component into the bigger one (union by size), so any rectangle is relabeled
+    at most O(log n) times. Unlinking searches both sides of the removed edge at the same time and stops as soon
+    as the sides meet or one of them is exhausted. When the component splits, the cost depends on its smaller part,
+    but when the sides are still connected through a cycle the searches can cover most of the component before they meet
+    """
+    def __init__(self):
+        # multiset of links between rectangles
+        # key -> rectangle id
+        # value -> map of linked rectangle id to amount of lines between them
+        self.__links: Dict[str, Dict[str, int]] = {}
+
+        # map of rectangles to their components
+        # key -> rectangle id
+        # value -> component id
+        self.__labels: Dict[str, int] = {}
+
+        # map of components to their members
+        # key -> component id
+        # value -> set of rectangle ids
+        self.__members: Dict[int, Set[str]] = {}
+
+        self.__component_ids = count()
+
+    def add_rect(self, rect_id: str) -> None:
+        """Adds a rectangle as a separate component"""
+        if rect_id in self.__labels:
+            return
+
+        component_id = next(self.__component_ids)
+        self.__links[rect_id] = {}
+        self.__labels[rect_id] = component_id
+        self.__members[component_id] = {rect_id}
+
+    def link(self, first_rect_id: str, second_rect_id: str) -> None:
+        """Registers a line between rectangles and merges their components"""
+        first_links = self.__links[first_rect_id]
+        second_links = self.__links[second_rect_id]
+        first_links[second_rect_id] = first_links.get(second_rect_id, 0) + 1
+        second_links[first_rect_id] = second_links.get(first_rect_id, 0) + 1
+
+        first_component_id = self.__labels[first_rect_id]
+        second_component_id = self.__labels[second_rect_id]
+
+        if first_component_id == second_component_id:
+            return
+
+        # relabel the smaller component
+        if len(self.__members[first_component_id]) < len(self.__members[second_component_id]):
+            first_component_id, second_component_id = second_component_id, first_component_id
+
+        moved_members = self.__members.pop(second_component_id)
+
+        for rect_id in moved_members:
+            self.__labels[rect_id] = first_component_id
+
+        self.__members[first_component_id].update(moved_members)
+
+    def unlink(self, first_rect_id: str, second_rect_id: str) -> None:
+        """Unregisters a line between rectangles and splits their component if it was the last path between them"""
+        first_links = self.__links[first_rect_id]
+        second_links = self.__links[second_rect_id]
+
+        first_links[second_rect_id] -= 1
+        second_links[first_rect_id] -= 1
+
+        # rectangles are still linked directly by another line
+        if first_links[second_rect_id] > 0:
+            return
+
+        first_links.pop(second_rect_id)
+        second_links.pop(first_rect_id)
+
+        separated_part = self.__find_separated_part(first_rect_id, second_rect_id)
+
+        if separated_part is None:
+            return
+
+        component_id = self.__labels[first_rect_id]
+        self.__members[component_id].difference_update(separated_part)
+
+        new_component_id = next(self.__component_ids)
+        self.__members[new_component_id] = separated_part
+
+        for rect_id in separated_part:
+            self.__labels[rect_id] = new_component_id
+
+    def __find_separated_part(self, first_rect_id: str, second_rect_id: str) -> Optional[Set[str]]:
+        """
+        Runs breadth-first searches from both rectangles step by step.
+        Returns None if searches meet each other, otherwise returns all rectangles reached by the search
+        which was exhausted first
+        """
+        visited = ({first_rect_id}, {second_rect_id})
+        queues: tuple[Deque[str], Deque[str]] = (deque([first_rect_id]), deque([second_rect_id]))
+
+        while True:
+            for side in (0, 1):
+                queue = queues[side]
+
+                if not queue:
+                    return visited[side]
+
+                rect_id = queue.popleft()
+
+                for linked_rect_id in self.__links[rect_id]:
+                    if linked_rect_id in visited[1 - side]:
+                        return None
+
+                    if linked_rect_id not in visited[side]:
+                        visited[side].add(linked_rect_id)
+                        queue.append(linked_rect_id)
+
+    def get_component_id(self, rect_id: str) -> int:
+        return self.__labels[rect_id]
+
+    def get_component(self, rect_id: str) -> FrozenSet[str]:
+        """Returns ids of all rectangles linked with the rectangle directly or transitively, including itself"""
+        return frozenset(self.__members[self.__labels[rect_id]])
+
+    def is_connected(self, first_rect_id: str, second_rect_id: str) -> bool:
+        return self.__labels[first_rect_id] == self.__labels[second_rect_id]
@@ -9,9 +9,24 @@ POINT_INTERSECTION_THRESHOLD = 0.1
 
 QTREE_NODE_CAPACITY = 4
 
+# size of a chunk read from the command stream at once, all complete commands from the chunk form one batch
+COMMAND_READ_CHUNK_SIZE = 1 << 16
+
 
 class ActionType:
     DRAG_RECT = 'DRAG_RECT'
     CREATE_REF_LINE = 'CREATE_REF_LINE'
     DELETE_REF_LINE = 'DELETE_REF_LINE'
+    DRAG_COMPONENT = 'DRAG_COMPONENT'
+    HIGHLIGHT_COMPONENT = 'HIGHLIGHT_COMPONENT'
+
 
+class CommandType:
+    CREATE_RECT = 'create_rect'
+    MOVE_RECT = 'move_rect'
+    LINK = 'link'
+    UNLINK = 'unlink'
+    QUERY_REGION = 'query_region'
+    MOVE_COMPONENT = 'move_component'
+    COMPONENT = 'component'
+    SAVE = 'save'
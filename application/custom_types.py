@@ -1,4 +1,4 @@
-from typing import TypedDict, Optional, TypeVar
+from typing import TypedDict, Optional, TypeVar, NamedTuple, Tuple
 
 from PyQt6.QtCore import QPoint, QRect
 from PyQt6.QtGui import QColor
@@ -18,6 +18,30 @@ class RectDataT(TypedDict):
     color: QColor
 
 
+class RectSnapshotT(NamedTuple):
+    id: str
+    x: int
+    y: int
+    width: int
+    height: int
+    color: int
+
+
+class ReferenceLineSnapshotT(NamedTuple):
+    id: str
+    first_rect_id: str
+    second_rect_id: str
+    x1: int
+    y1: int
+    x2: int
+    y2: int
+
+
+# rectangle on the plane stored as (x, y, width, height)
+BoxT = Tuple[int, int, int, int]
+
 QuadTreeDataT = TypeVar("QuadTreeDataT")
 QuadTreeNodeT = TypeVar("QuadTreeNodeT")
 QuadTreeNodeDataT = TypeVar("QuadTreeNodeDataT")
+PersistentMapKeyT = TypeVar("PersistentMapKeyT")
+PersistentMapValueT = TypeVar("PersistentMapValueT")
@@ -40,10 +40,24 @@ class MainWindow(QWidget):
         self.setPalette(palette)
 
     def __draw_rectangles(self, painter: QPainter) -> None:
-        """Draws all rectangles"""
+        """Draws all rectangles and outlines rectangles of the highlighted component"""
+        highlighted_component_id = self.scene.highlighted_component_id
+
+        pen = QPen(QColor(255, 0, 0))
+        pen.setWidthF(3)
+        painter.setPen(pen)
+
         for rect in self.scene.rectangles:
             painter.fillRect(rect["rect"], rect["color"])
 
+            is_highlighted = (
+                highlighted_component_id is not None
+                and self.scene.get_component_id(rect["id"]) == highlighted_component_id
+            )
+
+            if is_highlighted:
+                painter.drawRect(rect["rect"])
+
     def __draw_reference_lines(self, painter: QPainter) -> None:
         """Draw all reference lines"""
         pen = QPen(QColor(0, 0, 0))
@@ -82,6 +96,15 @@ class MainWindow(QWidget):
             self.scene.start_drag_rect(event_point)
             return
 
+        if self.scene.current_action == const.ActionType.DRAG_COMPONENT:
+            self.scene.start_drag_component(event_point)
+            return
+
+        if self.scene.current_action == const.ActionType.HIGHLIGHT_COMPONENT:
+            self.scene.highlight_component(event_point)
+            self.update()
+            return
+
         if self.scene.current_action == const.ActionType.CREATE_REF_LINE:
             self.scene.start_creating_ref_line(event_point)
             return
@@ -100,6 +123,9 @@ class MainWindow(QWidget):
         if self.scene.current_action == const.ActionType.DRAG_RECT:
             self.scene.drag_rect(event_point)
 
+        if self.scene.current_action == const.ActionType.DRAG_COMPONENT:
+            self.scene.drag_component(event_point)
+
         if self.scene.current_action == const.ActionType.CREATE_REF_LINE:
             self.scene.move_end_point_ref_line(event_point)
 
@@ -109,7 +135,7 @@ class MainWindow(QWidget):
         if event is None:
             return
 
-        if self.scene.current_action == const.ActionType.DRAG_RECT:
+        if self.scene.current_action in (const.ActionType.DRAG_RECT, const.ActionType.DRAG_COMPONENT):
             self.scene.finish_drag_rect()
 
         if self.scene.current_action == const.ActionType.CREATE_REF_LINE:
@@ -0,0 +1,186 @@
+from typing import Generic, Iterator, Optional, Tuple, Union
+
+from custom_types import PersistentMapKeyT, PersistentMapValueT
+
+# every level of the trie consumes this amount of bits of the key hash
+HASH_BITS_PER_LEVEL = 5
+BRANCH_WIDTH = 1 << HASH_BITS_PER_LEVEL
+BRANCH_MASK = BRANCH_WIDTH - 1
+HASH_MASK = (1 << 64) - 1
+
+
+class _Leaf:
+    """Bucket of entries whose keys have exactly the same hash"""
+    __slots__ = ("key_hash", "entries")
+
+    def __init__(self, key_hash: int, entries: Tuple[Tuple[object, object], ...]):
+        self.key_hash = key_hash
+        self.entries = entries
+
+
+class _Branch:
+    """Inner node of the trie"""
+    __slots__ = ("children",)
+
+    def __init__(self, children: Tuple[Optional[Union["_Branch", _Leaf]], ...]):
+        self.children = children
+
+
+NodeT = Optional[Union[_Branch, _Leaf]]
+
+EMPTY_CHILDREN: Tuple[NodeT, ...] = (None,) * BRANCH_WIDTH
+
+
+def _hash_key(key: object) -> int:
+    return hash(key) & HASH_MASK
+
+
+def _index(key_hash: int, depth: int) -> int:
+    return (key_hash >> (depth * HASH_BITS_PER_LEVEL)) & BRANCH_MASK
+
+
+def _replace_child(branch: _Branch, index: int, child: NodeT) -> _Branch:
+    children = list(branch.children)
+    children[index] = child
+    return _Branch(tuple(children))
+
+
+def _set(node: NodeT, key_hash: int, key: object, value: object, depth: int) -> Tuple[NodeT, bool]:
+    """
+    Returns a copy of the node with the key set to the value and a flag whether a new key was added.
+    Only nodes on the path to the key are copied, the rest of the trie is shared with the original node
+    """
+    if node is None:
+        return _Leaf(key_hash, ((key, value),)), True
+
+    if isinstance(node, _Leaf):
+        if node.key_hash == key_hash:
+            for i, (entry_key, _) in enumerate(node.entries):
+                if entry_key == key:
+                    entries = node.entries[:i] + ((key, value),) + node.entries[i + 1:]
+                    return _Leaf(key_hash, entries), False
+
+            return _Leaf(key_hash, node.entries + ((key, value),)), True
+
+        # hashes are different so the existing leaf should be pushed one level down
+        node = _replace_child(_Branch(EMPTY_CHILDREN), _index(node.key_hash, depth), node)
+
+    index = _index(key_hash, depth)
+    child, added = _set(node.children[index], key_hash, key, value, depth + 1)
+
+    return _replace_child(node, index, child), added
+
+
+def _remove(node: NodeT, key_hash: int, key: object, depth: int) -> Tuple[NodeT, bool]:
+    """
+    Returns a copy of the node without the key and a flag whether the key was removed.
+    Branches left with a single leaf are collapsed so the trie does not keep empty paths
+    """
+    if node is None:
+        return None, False
+
+    if isinstance(node, _Leaf):
+        if node.key_hash != key_hash:
+            return node, False
+
+        entries = tuple(entry for entry in node.entries if entry[0] != key)
+
+        if len(entries) == len(node.entries):
+            return node, False
+
+        return (_Leaf(key_hash, entries) if entries else None), True
+
+    index = _index(key_hash, depth)
+    child, removed = _remove(node.children[index], key_hash, key, depth + 1)
+
+    if not removed:
+        return node, False
+
+    branch = _replace_child(node, index, child)
+    children = [c for c in branch.children if c is not None]
+
+    if len(children) == 0:
+        return None, True
+
+    if len(children) == 1 and isinstance(children[0], _Leaf):
+        return children[0], True
+
+    return branch, True
+
+
+def _get(node: NodeT, key_hash: int, key: object) -> Optional[Tuple[object, object]]:
+    depth = 0
+
+    while isinstance(node, _Branch):
+        node = node.children[_index(key_hash, depth)]
+        depth += 1
+
+    if node is None or node.key_hash != key_hash:
+        return None
+
+    for entry in node.entries:
+        if entry[0] == key:
+            return entry
+
+    return None
+
+
+def _iterate(node: NodeT) -> Iterator[Tuple[object, object]]:
+    if node is None:
+        return
+
+    if isinstance(node, _Leaf):
+        yield from node.entries
+        return
+
+    for child in node.children:
+        yield from _iterate(child)
+
+
+class PersistentMap(Generic[PersistentMapKeyT, PersistentMapValueT]):
+    """
+    Immutable hash map based on a hash array mapped trie.
+    Every modification returns a new map which shares all untouched nodes with the previous one,
+    so a change costs O(log32 n) and old versions stay valid and can be read from any thread
+    """
+    __slots__ = ("__root", "__size")
+
+    def __init__(self, root: NodeT = None, size: int = 0):
+        self.__root = root
+        self.__size = size
+
+    def __len__(self) -> int:
+        return self.__size
+
+    def __contains__(self, key: PersistentMapKeyT) -> bool:
+        return _get(self.__root, _hash_key(key), key) is not None
+
+    def get(self, key: PersistentMapKeyT) -> Optional[PersistentMapValueT]:
+        entry = _get(self.__root, _hash_key(key), key)
+
+        return entry[1] if entry is not None else None  # type: ignore
+
+    def set(
+        self,
+        key: PersistentMapKeyT,
+        value: PersistentMapValueT
+    ) -> "PersistentMap[PersistentMapKeyT, PersistentMapValueT]":
+        """Returns a new map with the key set to the value"""
+        root, added = _set(self.__root, _hash_key(key), key, value, 0)
+
+        return PersistentMap(root, self.__size + 1 if added else self.__size)
+
+    def remove(self, key: PersistentMapKeyT) -> "PersistentMap[PersistentMapKeyT, PersistentMapValueT]":
+        """Returns a new map without the key"""
+        root, removed = _remove(self.__root, _hash_key(key), key, 0)
+
+        if not removed:
+            return self
+
+        return PersistentMap(root, self.__size - 1)
+
+    def items(self) -> Iterator[Tuple[PersistentMapKeyT, PersistentMapValueT]]:
+        return _iterate(self.__root)  # type: ignore
+
+    def values(self) -> Iterator[PersistentMapValueT]:
+        return (value for _, value in self.items())
@@ -0,0 +1,149 @@
+from typing import Dict, List, Optional, Tuple
+
+from custom_types import BoxT, RectSnapshotT
+
+
+def get_box(entry: RectSnapshotT) -> BoxT:
+    return entry.x, entry.y, entry.width, entry.height
+
+
+def boxes_intersect(first: BoxT, second: BoxT) -> bool:
+    """Checks intersection of two boxes in the same way as QRect.intersects does"""
+    x1, y1, w1, h1 = first
+    x2, y2, w2, h2 = second
+
+    if w1 <= 0 or h1 <= 0 or w2 <= 0 or h2 <= 0:
+        return False
+
+    return x1 < x2 + w2 and x2 < x1 + w1 and y1 < y2 + h2 and y2 < y1 + h1
+
+
+class PersistentQuadTreeNode:
+    """
+    Immutable node of the quad tree.
+    Insertion and deletion copy only the nodes on the path to the changed entry,
+    all other subquads are shared between the old and the new version of the tree
+    """
+    __slots__ = ("__boundary", "__capacity", "__entries", "__children")
+
+    def __init__(
+        self,
+        boundary: BoxT,
+        capacity: int,
+        entries: Tuple[RectSnapshotT, ...] = (),
+        children: Optional[Tuple["PersistentQuadTreeNode", ...]] = None
+    ):
+        self.__boundary = boundary
+        self.__capacity = capacity
+        self.__entries = entries
+        self.__children = children
+
+    @property
+    def boundary(self) -> BoxT:
+        return self.__boundary
+
+    def insert(self, entry: RectSnapshotT) -> "PersistentQuadTreeNode":
+        """Returns a copy of the node with the entry inserted"""
+        if not boxes_intersect(self.__boundary, get_box(entry)):
+            return self
+
+        if self.__children is None:
+            entries = self.__entries + (entry,)
+
+            if len(entries) > self.__capacity:  # if this quad have enough entries then divide it
+                return self.__subdivided(entries)
+
+            return PersistentQuadTreeNode(self.__boundary, self.__capacity, entries)
+
+        children = tuple(child.insert(entry) for child in self.__children)
+
+        return PersistentQuadTreeNode(self.__boundary, self.__capacity, (), children)
+
+    def delete(self, entry: RectSnapshotT) -> "PersistentQuadTreeNode":
+        """Returns a copy of the node without the entry, the entry is searched by its id and position"""
+        if not boxes_intersect(self.__boundary, get_box(entry)):
+            return self
+
+        if self.__children is None:
+            entries = tuple(e for e in self.__entries if e.id != entry.id)
+
+            if len(entries) == len(self.__entries):
+                return self
+
+            return PersistentQuadTreeNode(self.__boundary, self.__capacity, entries)
+
+        children = tuple(child.delete(entry) for child in self.__children)
+
+        if all(new is old for new, old in zip(children, self.__children)):
+            return self
+
+        return PersistentQuadTreeNode(self.__boundary, self.__capacity, (), children)
+
+    def __subdivided(self, entries: Tuple[RectSnapshotT, ...]) -> "PersistentQuadTreeNode":
+        """Creates a divided copy of the node and moves all given entries to the new subquads"""
+        x, y, width, height = self.__boundary
+
+        half_width = width // 2
+        half_height = height // 2
+
+        # quad cannot be divided anymore so it keeps all entries by itself
+        if half_width == 0 or half_height == 0:
+            return PersistentQuadTreeNode(self.__boundary, self.__capacity, entries)
+
+        # right and bottom subquads take the remainder so odd sizes do not lose a strip of the boundary
+        rest_width = width - half_width
+        rest_height = height - half_height
+
+        children = [
+            PersistentQuadTreeNode((x, y, half_width, half_height), self.__capacity),
+            PersistentQuadTreeNode((x + half_width, y, rest_width, half_height), self.__capacity),
+            PersistentQuadTreeNode((x, y + half_height, half_width, rest_height), self.__capacity),
+            PersistentQuadTreeNode((x + half_width, y + half_height, rest_width, rest_height), self.__capacity),
+        ]
+
+        # one entry can intersect several subquads so every subquad should be checked
+        for entry in entries:
+            for i in range(len(children)):
+                children[i] = children[i].insert(entry)
+
+        return PersistentQuadTreeNode(self.__boundary, self.__capacity, (), tuple(children))
+
+    def query(self, range_box: BoxT, found_entries: Dict[str, RectSnapshotT]) -> None:
+        """Collects all entries which intersect given box into found_entries"""
+        if not boxes_intersect(self.__boundary, range_box):
+            return
+
+        for entry in self.__entries:
+            if boxes_intersect(range_box, get_box(entry)):
+                found_entries[entry.id] = entry
+
+        if self.__children is not None:
+            for child in self.__children:
+                child.query(range_box, found_entries)
+
+
+class PersistentQuadTree:
+    """Quad tree where every modification returns a new version and keeps the previous one untouched"""
+    __slots__ = ("__root",)
+
+    def __init__(self, root: PersistentQuadTreeNode):
+        self.__root = root
+
+    @classmethod
+    def empty(cls, boundary: BoxT, capacity: int) -> "PersistentQuadTree":
+        return cls(PersistentQuadTreeNode(boundary, capacity))
+
+    def insert(self, entry: RectSnapshotT) -> "PersistentQuadTree":
+        return PersistentQuadTree(self.__root.insert(entry))
+
+    def delete(self, entry: RectSnapshotT) -> "PersistentQuadTree":
+        return PersistentQuadTree(self.__root.delete(entry))
+
+    def update(self, old_entry: RectSnapshotT, new_entry: RectSnapshotT) -> "PersistentQuadTree":
+        return PersistentQuadTree(self.__root.delete(old_entry).insert(new_entry))
+
+    def query(self, range_box: BoxT) -> List[RectSnapshotT]:
+        found_entries: Dict[str, RectSnapshotT] = {}
+        self.__root.query(range_box, found_entries)
+
+        return list(found_entries.values())
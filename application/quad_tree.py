@@ -10,6 +10,8 @@ class QuadTreeNodeData(Generic[QuadTreeNodeDataT]):
         self.__rect = rect
         self.__data = data
         self.__id = rect_id
+        # copy of the rect at the moment of insertion, the rect itself can be moved before the tree is updated
+        self.__indexed_rect = QRect(rect)
 
     @property
     def id(self) -> str:
@@ -19,10 +21,18 @@ class QuadTreeNodeData(Generic[QuadTreeNodeDataT]):
     def rect(self) -> QRect:
         return self.__rect
 
+    @property
+    def indexed_rect(self) -> QRect:
+        return self.__indexed_rect
+
     @property
     def data(self) -> QuadTreeNodeDataT:
         return self.__data
 
+    def reindex(self) -> None:
+        """Remembers current position of the rect as a position in the tree"""
+        self.__indexed_rect = QRect(self.__rect)
+
 
 class QuadTreeNode(Generic[QuadTreeNodeT]):
     def __init__(self, boundary: QRect, capacity: int):
@@ -41,7 +51,7 @@ class QuadTreeNode(Generic[QuadTreeNodeT]):
 
     def insert(self, node: QuadTreeNodeData[QuadTreeNodeT]) -> bool:
         """Inserts a rectangle into the tree."""
-        if not self.__boundary.intersects(node.rect):
+        if not self.__boundary.intersects(node.indexed_rect):
             return False
 
         if not self.__divided:  # while we didn't divide this quad insert into it
@@ -66,7 +76,7 @@ class QuadTreeNode(Generic[QuadTreeNodeT]):
 
     def delete(self, node: QuadTreeNodeData[QuadTreeNodeT]) -> None:
         """Deletes a rectangle from the tree."""
-        if not self.__boundary.intersects(node.rect):
+        if not self.__boundary.intersects(node.indexed_rect):
             return
 
         if node in self.__node_data_list:
@@ -112,29 +122,28 @@ class QuadTreeNode(Generic[QuadTreeNodeT]):
             self.__bot_left_tree.insert(node_data)
             self.__bot_right_tree.insert(node_data)
 
-    def query(self, range_rect: QRect) -> Dict[str, QuadTreeNodeData[QuadTreeNodeT]]:
-        """Finds all rectangles which intersect given rectangle"""
-        found_rectangles: Dict[str, QuadTreeNodeData[QuadTreeNodeT]] = {}
+        # rects are stored only in subquads now otherwise they couldn't be deleted from subquads
+        self.__node_data_list = []
 
+    def query(self, range_rect: QRect, found_rectangles: Dict[str, QuadTreeNodeData[QuadTreeNodeT]]) -> None:
+        """Collects all rectangles which intersect given rectangle into found_rectangles"""
         if not self.__boundary.intersects(range_rect):
-            return found_rectangles
+            return
 
         # check every rectangle on intersection
         for node_data in self.__node_data_list:
             if range_rect.intersects(node_data.rect):
                 found_rectangles[node_data.id] = node_data
 
-        # go through all subquads
-        if self.__top_left_tree and self.__top_left_tree.boundary.intersects(range_rect):
-            found_rectangles.update(self.__top_left_tree.query(range_rect))
-        if self.__top_right_tree and self.__top_right_tree.boundary.intersects(range_rect):
-            found_rectangles.update(self.__top_right_tree.query(range_rect))
-        if self.__bot_left_tree and self.__bot_left_tree.boundary.intersects(range_rect):
-            found_rectangles.update(self.__bot_left_tree.query(range_rect))
-        if self.__bot_right_tree and self.__bot_right_tree.boundary.intersects(range_rect):
-            found_rectangles.update(self.__bot_right_tree.query(range_rect))
-
-        return found_rectangles
+        # go through all subquads, every subquad checks intersection with its boundary by itself
+        if self.__top_left_tree:
+            self.__top_left_tree.query(range_rect, found_rectangles)
+        if self.__top_right_tree:
+            self.__top_right_tree.query(range_rect, found_rectangles)
+        if self.__bot_left_tree:
+            self.__bot_left_tree.query(range_rect, found_rectangles)
+        if self.__bot_right_tree:
+            self.__bot_right_tree.query(range_rect, found_rectangles)
 
     def traverse(self) -> List[QuadTreeNodeData[QuadTreeNodeT]]:
         """Traverses a tree and returns all node_data"""
@@ -159,14 +168,22 @@ class QuadTree(Generic[QuadTreeDataT]):
         self.root = QuadTreeNode[QuadTreeDataT](boundary, capacity)
 
     def insert(self, rect: QuadTreeNodeData[QuadTreeDataT]) -> bool:
+        rect.reindex()
         return self.root.insert(rect)
 
     def update(self, rect: QuadTreeNodeData[QuadTreeDataT]) -> None:
+        # delete by the previous position because rect could be already moved
         self.root.delete(rect)
+        rect.reindex()
         self.root.insert(rect)
 
     def query(self, range_rect: QRect) -> List[QuadTreeNodeData[QuadTreeDataT]]:
-        return list(self.root.query(range_rect).values())
+        found_rectangles: Dict[str, QuadTreeNodeData[QuadTreeDataT]] = {}
+        self.root.query(range_rect, found_rectangles)
+
+        return list(found_rectangles.values())
 
     def traverse(self) -> List[QuadTreeDataT]:
-        return list(map(lambda n: n.data, self.root.traverse()))
+        # one rect can be stored in several subquads so duplicates are removed by id
+        nodes = {n.id: n for n in self.root.traverse()}
+        return list(map(lambda n: n.data, nodes.values()))
@@ -0,0 +1,111 @@
+from typing import Dict, Generic, List, Tuple
+
+from PyQt6.QtCore import QRect
+
+from custom_types import QuadTreeDataT
+from quad_tree import QuadTreeNodeData
+
+
+class RectGrid(Generic[QuadTreeDataT]):
+    """
+    Uniform grid of rectangles which are moved but not updated into the quad tree yet.
+    Updating a cell of the grid is much cheaper than deleting and inserting a rectangle into the tree,
+    so the tree can be updated once for all moved rectangles
+    """
+    def __init__(self, cell_width: int, cell_height: int):
+        self.__cell_width = cell_width
+        self.__cell_height = cell_height
+
+        # map of grid cells
+        # key -> cell coordinates
+        # value -> map of rectangle id to rectangle data
+        self.__cells: Dict[Tuple[int, int], Dict[str, QuadTreeNodeData[QuadTreeDataT]]] = {}
+
+        # map of rectangles to cells they are stored in
+        # key -> rectangle id
+        # value -> list of cell coordinates
+        self.__node_cells: Dict[str, List[Tuple[int, int]]] = {}
+
+        # map of all rectangles in the grid
+        # key -> rectangle id
+        # value -> rectangle data
+        self.__nodes: Dict[str, QuadTreeNodeData[QuadTreeDataT]] = {}
+
+    def __len__(self) -> int:
+        return len(self.__nodes)
+
+    def __contains__(self, rect_id: str) -> bool:
+        return rect_id in self.__nodes
+
+    @property
+    def nodes(self) -> List[QuadTreeNodeData[QuadTreeDataT]]:
+        return list(self.__nodes.values())
+
+    def __get_cell_range(self, rect: QRect) -> Tuple[range, range]:
+        """Returns ranges of columns and rows of cells which intersect the rectangle"""
+        left = rect.x() // self.__cell_width
+        top = rect.y() // self.__cell_height
+        right = (rect.x() + rect.width() - 1) // self.__cell_width
+        bottom = (rect.y() + rect.height() - 1) // self.__cell_height
+
+        return range(left, right + 1), range(top, bottom + 1)
+
+    def __get_cells(self, rect: QRect) -> List[Tuple[int, int]]:
+        """Returns coordinates of all cells which intersect the rectangle"""
+        columns, rows = self.__get_cell_range(rect)
+
+        return [(x, y) for x in columns for y in rows]
+
+    def insert(self, node: QuadTreeNodeData[QuadTreeDataT]) -> None:
+        """Inserts the rectangle or moves it to cells of its current position"""
+        self.remove(node.id)
+
+        cells = self.__get_cells(node.rect)
+
+        for cell in cells:
+            self.__cells.setdefault(cell, {})[node.id] = node
+
+        self.__node_cells[node.id] = cells
+        self.__nodes[node.id] = node
+
+    def remove(self, rect_id: str) -> None:
+        if rect_id not in self.__nodes:
+            return
+
+        for cell in self.__node_cells.pop(rect_id):
+            cell_nodes = self.__cells[cell]
+            cell_nodes.pop(rect_id)
+
+            if len(cell_nodes) == 0:
+                self.__cells.pop(cell)
+
+        self.__nodes.pop(rect_id)
+
+    def query(self, range_rect: QRect) -> Dict[str, QuadTreeNodeData[QuadTreeDataT]]:
+        """Finds all rectangles which intersect given rectangle"""
+        found_rectangles: Dict[str, QuadTreeNodeData[QuadTreeDataT]] = {}
+
+        if len(self.__nodes) == 0 or range_rect.width() <= 0 or range_rect.height() <= 0:
+            return found_rectangles
+
+        columns, rows = self.__get_cell_range(range_rect)
+
+        # large range covers more cells than there are rectangles, so it is cheaper to check every rectangle
+        if len(columns) * len(rows) > len(self.__nodes):
+            for node in self.__nodes.values():
+                if range_rect.intersects(node.rect):
+                    found_rectangles[node.id] = node
+
+            return found_rectangles
+
+        for cell in self.__get_cells(range_rect):
+            for node in self.__cells.get(cell, {}).values():
+                if range_rect.intersects(node.rect):
+                    found_rectangles[node.id] = node
+
+        return found_rectangles
+
+    def clear(self) -> None:
+        self.__cells = {}
+        self.__node_cells = {}
+        self.__nodes = {}
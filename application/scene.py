@@ -1,4 +1,4 @@
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Set, FrozenSet
 
 from PyQt6.QtCore import Qt, QPoint, QRect
 from PyQt6.QtGui import QMouseEvent
@@ -6,8 +6,11 @@ from PyQt6.QtGui import QMouseEvent
 import utils
 from custom_types import ReferenceLineT, RectDataT
 
+from connectivity import ConnectivityIndex
 from constants import RECT_HEIGHT, RECT_WIDTH, QTREE_NODE_CAPACITY, ActionType
 from quad_tree import QuadTree, QuadTreeNodeData
+from rect_grid import RectGrid
+from snapshot import SceneSnapshot
 
 
 class Scene:
@@ -32,8 +35,37 @@ class Scene:
         # rect data used in process of dragging rect
         self.__current_rect_data: Optional[QuadTreeNodeData] = None
 
+        # map of all rectangles
+        # key -> rectangle id
+        # value -> rectangle data stored in the tree
+        self.__rect_nodes: Dict[str, QuadTreeNodeData[RectDataT]] = {}
+
+        # rectangles which were moved but their positions in the tree have not been updated yet
+        # they are found by their current positions in this grid until the tree is updated for all of them at once
+        self.__unindexed_rects = RectGrid[RectDataT](RECT_WIDTH, RECT_HEIGHT)
+
+        # connected components of the graph of rectangles linked by reference lines
+        self.__connectivity = ConnectivityIndex()
+
+        # ids of rectangles used in process of dragging the component
+        self.__current_component: FrozenSet[str] = frozenset()
+
+        # id of any rectangle of the highlighted component
+        self.__highlighted_rect_id: Optional[str] = None
+
         self.__qtree = QuadTree[RectDataT](QRect(0, 0, width, height), QTREE_NODE_CAPACITY)
 
+        # last immutable snapshot of the scene
+        self.__snapshot = SceneSnapshot.empty(width, height, QTREE_NODE_CAPACITY)
+
+        # rectangles changed since the last snapshot
+        # key -> rectangle id
+        # value -> rectangle data
+        self.__changed_rects: Dict[str, RectDataT] = {}
+
+        # ids of reference lines changed since the last snapshot
+        self.__changed_line_ids: Set[str] = set()
+
     @property
     def rectangles(self) -> List[RectDataT]:
         return self.__qtree.traverse()
@@ -46,9 +78,61 @@ class Scene:
     def current_action(self) -> Optional[str]:
         return self.__current_action
 
+    @property
+    def highlighted_component_id(self) -> Optional[int]:
+        if self.__highlighted_rect_id is None:
+            return None
+
+        return self.__connectivity.get_component_id(self.__highlighted_rect_id)
+
+    def take_snapshot(self) -> SceneSnapshot:
+        """
+        Returns an immutable snapshot of the current state of the scene.
+        Must be called from the thread which modifies the scene, but the result can be passed to any thread
+        """
+        if len(self.__changed_rects) == 0 and len(self.__changed_line_ids) == 0:
+            return self.__snapshot
+
+        changed_lines = {line_id: self.__reference_lines.get(line_id) for line_id in self.__changed_line_ids}
+        self.__snapshot = self.__snapshot.apply(self.__changed_rects.values(), changed_lines)
+
+        self.__changed_rects = {}
+        self.__changed_line_ids = set()
+
+        return self.__snapshot
+
+    def update_index(self) -> None:
+        """Updates positions of all moved rectangles into tree"""
+        for rect_data in self.__unindexed_rects.nodes:
+            self.__qtree.update(rect_data)
+
+        self.__unindexed_rects.clear()
+
+    def __query(self, range_rect: QRect) -> List[QuadTreeNodeData[RectDataT]]:
+        """Finds all rectangles which intersect given rectangle including moved rectangles not updated into tree"""
+        data_list = self.__qtree.query(range_rect)
+
+        if len(self.__unindexed_rects) == 0:
+            return data_list
+
+        # moved rectangles can be found by tree in old positions as well so duplicates are removed by id
+        found_rectangles = {rect_data.id: rect_data for rect_data in data_list}
+        found_rectangles.update(self.__unindexed_rects.query(range_rect))
+
+        return list(found_rectangles.values())
+
+    def get_rect(self, rect_id: str) -> Optional[RectDataT]:
+        rect_data = self.__rect_nodes.get(rect_id)
+
+        return rect_data.data if rect_data is not None else None
+
+    def query_region(self, range_rect: QRect) -> List[RectDataT]:
+        """Returns all rectangles which intersect given rectangle"""
+        return list(map(lambda n: n.data, self.__query(range_rect)))
+
     def start_creating_ref_line(self, event_point: QPoint) -> None:
         """Initiates a process of creating the reference line"""
-        data_list = self.__qtree.query(QRect(event_point.x(), event_point.y(), 1, 1))
+        data_list = self.__query(QRect(event_point.x(), event_point.y(), 1, 1))
 
         # check that only one rectangle under current event_point
         if len(data_list) == 0 or len(data_list) > 1:
@@ -79,7 +163,7 @@ class Scene:
         if self.__current_line_id is None:
             return
 
-        data_list = self.__qtree.query(QRect(event_point.x(), event_point.y(), 1, 1))
+        data_list = self.__query(QRect(event_point.x(), event_point.y(), 1, 1))
         count = len(data_list)
         line = self.__reference_lines[self.__current_line_id]
 
@@ -90,12 +174,8 @@ class Scene:
             self.__reference_lines.pop(self.__current_line_id)
         else:
             # otherwise finish filling references between rectangles and lines
-            rect_id = data_list[0].data["id"]
-            self.__reference_lines[self.__current_line_id]["second_rect_id"] = rect_id
-            self.__rectangle_refs[rect_id].append(self.__current_line_id)
-
-            if line["first_rect_id"]:
-                self.__rectangle_refs[line["first_rect_id"]].append(self.__current_line_id)
+            line["second_rect_id"] = data_list[0].data["id"]
+            self.__add_ref_line(line)
 
     def delete_ref_line(self, point: QPoint) -> None:
         """Deletes the reference line under the point"""
@@ -107,19 +187,72 @@ class Scene:
                 continue
 
             if utils.check_point_on_the_line(point, start_point, end_point):
-                self.__rectangle_refs[first_rect_id].remove(line["id"])
-                self.__rectangle_refs[second_rect_id].remove(line["id"])
-                self.__reference_lines.pop(line["id"])
+                self.__remove_ref_line(line)
                 break
 
-    def create_rect(self, event_point: QPoint) -> None:
-        """Creates a rectangle"""
+    def link_rects(self, first_rect_id: str, second_rect_id: str) -> Optional[str]:
+        """Creates the reference line between centers of two rectangles and returns its id"""
+        first_rect_data = self.__rect_nodes.get(first_rect_id)
+        second_rect_data = self.__rect_nodes.get(second_rect_id)
+
+        if first_rect_data is None or second_rect_data is None or first_rect_id == second_rect_id:
+            return None
+
+        line_id = utils.generate_random_id()
+        line: ReferenceLineT = {
+            "id": line_id,
+            "first_rect_id": first_rect_id,
+            "second_rect_id": second_rect_id,
+            "start_point": first_rect_data.rect.center(),
+            "end_point": second_rect_data.rect.center(),
+        }
+        self.__reference_lines[line_id] = line
+        self.__add_ref_line(line)
+
+        return line_id
+
+    def unlink_rects(self, line_id: str) -> bool:
+        """Deletes the reference line by its id"""
+        line = self.__reference_lines.get(line_id)
+
+        if line is None or line["first_rect_id"] is None or line["second_rect_id"] is None:
+            return False
+
+        self.__remove_ref_line(line)
+
+        return True
+
+    def __add_ref_line(self, line: ReferenceLineT) -> None:
+        """Fills references between rectangles and the line linked with both of them"""
+        if line["first_rect_id"]:
+            self.__rectangle_refs[line["first_rect_id"]].append(line["id"])
+        if line["second_rect_id"]:
+            self.__rectangle_refs[line["second_rect_id"]].append(line["id"])
+        if line["first_rect_id"] and line["second_rect_id"]:
+            self.__connectivity.link(line["first_rect_id"], line["second_rect_id"])
+
+        self.__changed_line_ids.add(line["id"])
+
+    def __remove_ref_line(self, line: ReferenceLineT) -> None:
+        """Removes the line and references between it and rectangles"""
+        if line["first_rect_id"]:
+            self.__rectangle_refs[line["first_rect_id"]].remove(line["id"])
+        if line["second_rect_id"]:
+            self.__rectangle_refs[line["second_rect_id"]].remove(line["id"])
+        if line["first_rect_id"] and line["second_rect_id"]:
+            self.__connectivity.unlink(line["first_rect_id"], line["second_rect_id"])
+
+        self.__reference_lines.pop(line["id"])
+        self.__changed_line_ids.add(line["id"])
+
+    def create_rect(self, event_point: QPoint) -> Optional[str]:
+        """Creates a rectangle centered at the event_point and returns its id"""
         adjusted_point = utils.get_adjusted_rect_point(event_point)
-        data_list = self.__qtree.query(QRect(adjusted_point.x(), adjusted_point.y(), RECT_WIDTH, RECT_HEIGHT))
+        data_list = self.__query(QRect(adjusted_point.x(), adjusted_point.y(), RECT_WIDTH, RECT_HEIGHT))
 
         # check that there is no intersections with other rectangles
         if len(data_list) != 0:
-            return
+            return None
 
         rect_id = utils.generate_random_id()
         rect = QRect(adjusted_point.x(), adjusted_point.y(), RECT_WIDTH, RECT_HEIGHT)
@@ -129,11 +262,16 @@ class Scene:
             "color": utils.generate_random_color(),
         })
         self.__qtree.insert(node_data)
+        self.__rect_nodes[rect_id] = node_data
         self.__rectangle_refs[rect_id] = []
+        self.__connectivity.add_rect(rect_id)
+        self.__changed_rects[rect_id] = node_data.data
+
+        return rect_id
 
     def start_drag_rect(self, event_point: QPoint) -> None:
         """Initiates a process of dragging the rectangle under the event_point"""
-        data_list = self.__qtree.query(QRect(event_point.x(), event_point.y(), 1, 1))
+        data_list = self.__query(QRect(event_point.x(), event_point.y(), 1, 1))
 
         if len(data_list) == 1:
             self.__current_rect_data = data_list[0]
@@ -143,7 +281,21 @@ class Scene:
         if self.__current_rect_data is None or self.__current_action != ActionType.DRAG_RECT:
             return
 
-        rect_data = self.__current_rect_data
+        self.__move_rect(self.__current_rect_data, event_point)
+
+    def move_rect(self, rect_id: str, event_point: QPoint) -> Optional[RectDataT]:
+        """Moves the rectangle so that its center would be at the event_point if possible and returns its data"""
+        rect_data = self.__rect_nodes.get(rect_id)
+
+        if rect_data is None:
+            return None
+
+        self.__move_rect(rect_data, event_point)
+
+        return rect_data.data
+
+    def __move_rect(self, rect_data: QuadTreeNodeData[RectDataT], event_point: QPoint) -> None:
+        """Moves the rectangle to the adjusted_point or to the last point before intersection with other rectangles"""
         rect = rect_data.data["rect"]
 
         adjusted_point = utils.get_adjusted_rect_point(event_point)
@@ -154,7 +306,7 @@ class Scene:
         if query_rect is None:
             return
 
-        data_list = self.__qtree.query(query_rect)
+        data_list = self.__query(query_rect)
 
         # remove current rect if it includes into intersected rectangles
         if rect_data in data_list:
@@ -169,12 +321,12 @@ class Scene:
             if vector is None:
                 return
 
-            # move adjusted point right to the last available point before intersection with nearest rectangles
-            adjusted_point = QPoint(rect.x() + vector[0], rect.y() + vector[1])
-            # recalculate dx and dy used for movement of reference lines
-            dx, dy = utils.calculate_rect_delta(adjusted_point, QPoint(rect.x(), rect.y()))
+            dx, dy = vector
 
-        # move all reference lines related to current rectangle
+        self.__shift_rect(rect_data, dx, dy)
+
+    def __shift_rect(self, rect_data: QuadTreeNodeData[RectDataT], dx: int, dy: int) -> None:
+        """Shifts the rectangle and all reference lines related to it by the vector"""
         for line_id in self.__rectangle_refs[rect_data.data["id"]]:
             line = self.__reference_lines[line_id]
 
@@ -186,26 +338,141 @@ class Scene:
 
             point.setX(point.x() + dx)
             point.setY(point.y() + dy)
+            self.__changed_line_ids.add(line_id)
 
-        rect.moveTo(adjusted_point)
+        rect_data.rect.translate(dx, dy)
+        self.__unindexed_rects.insert(rect_data)
+        self.__changed_rects[rect_data.id] = rect_data.data
 
     def finish_drag_rect(self) -> None:
-        """Finishes the process of dragging the current rectangle"""
-        if self.__current_rect_data is None:
+        """Finishes the process of dragging the current rectangle or component"""
+        # update rect positions into tree
+        self.update_index()
+
+    def get_component(self, rect_id: str) -> FrozenSet[str]:
+        """Returns ids of all rectangles linked with the rectangle directly or through other rectangles"""
+        if rect_id not in self.__rect_nodes:
+            return frozenset()
+
+        return self.__connectivity.get_component(rect_id)
+
+    def get_component_id(self, rect_id: str) -> int:
+        """Returns id of the component of the rectangle, linked rectangles have the same component id"""
+        return self.__connectivity.get_component_id(rect_id)
+
+    def are_linked(self, first_rect_id: str, second_rect_id: str) -> bool:
+        """Checks whether rectangles are linked directly or through other rectangles"""
+        if first_rect_id not in self.__rect_nodes or second_rect_id not in self.__rect_nodes:
+            return False
+
+        return self.__connectivity.is_connected(first_rect_id, second_rect_id)
+
+    def start_drag_component(self, event_point: QPoint) -> None:
+        """Initiates a process of dragging all rectangles linked with the rectangle under the event_point"""
+        self.start_drag_rect(event_point)
+
+        if self.__current_rect_data is not None:
+            self.__current_component = self.__connectivity.get_component(self.__current_rect_data.id)
+
+    def drag_component(self, event_point: QPoint) -> None:
+        """Drags current component so that current rectangle would be at the adjusted_point if possible"""
+        if self.__current_rect_data is None or self.__current_action != ActionType.DRAG_COMPONENT:
+            return
+
+        self.__move_component(self.__current_rect_data, self.__current_component, event_point)
+
+    def move_component(self, rect_id: str, event_point: QPoint) -> Optional[RectDataT]:
+        """
+        Moves all rectangles linked with the rectangle by the same vector so that its center would be
+        at the event_point if possible and returns its data
+        """
+        rect_data = self.__rect_nodes.get(rect_id)
+
+        if rect_data is None:
+            return None
+
+        self.__move_component(rect_data, self.__connectivity.get_component(rect_id), event_point)
+
+        return rect_data.data
+
+    def __move_component(
+        self,
+        rect_data: QuadTreeNodeData[RectDataT],
+        component: FrozenSet[str],
+        event_point: QPoint
+    ) -> None:
+        """Moves the component to the adjusted_point or to the last point before intersection with other rectangles"""
+        if len(component) == 1:
+            self.__move_rect(rect_data, event_point)
+            return
+
+        rect = rect_data.data["rect"]
+        members = [self.__rect_nodes[rect_id] for rect_id in component]
+
+        adjusted_point = utils.get_adjusted_rect_point(event_point)
+        dx, dy = utils.calculate_rect_delta(adjusted_point, QPoint(rect.x(), rect.y()))
+        dx, dy = utils.clamp_delta_to_window(list(map(lambda m: m.rect, members)), dx, dy)
+
+        for member in members:
+            query_rect = utils.get_query_rect(member.rect, dx, dy)
+
+            if query_rect is None:
+                return
+
+            data_list = self.__query(query_rect)
+            rectangles = [d.rect for d in data_list if d.id not in component]
+
+            if len(rectangles) == 0:
+                continue
+
+            vector = utils.calculate_vector_to_intersection_with(rectangles, member.rect, dx, dy)
+
+            # if we cannot find a better position just do nothing in that case
+            if vector is None:
+                return
+
+            # the whole component stops before the nearest intersection among all its rectangles
+            if abs(vector[0]) + abs(vector[1]) < abs(dx) + abs(dy):
+                dx, dy = vector
+
+        for member in members:
+            self.__shift_rect(member, dx, dy)
+
+    def highlight_component(self, event_point: QPoint) -> None:
+        """Highlights the component of the rectangle under the event_point or removes highlighting"""
+        data_list = self.__query(QRect(event_point.x(), event_point.y(), 1, 1))
+
+        if len(data_list) != 1:
+            self.__highlighted_rect_id = None
             return
 
-        # update rect position into tree
-        self.__qtree.update(self.__current_rect_data)
+        rect_id = data_list[0].id
+
+        # click on already highlighted component removes highlighting
+        if self.__highlighted_rect_id is not None and self.are_linked(rect_id, self.__highlighted_rect_id):
+            self.__highlighted_rect_id = None
+        else:
+            self.__highlighted_rect_id = rect_id
 
     def set_current_action(self, event: QMouseEvent) -> None:
         """Defines current action by event"""
         button = event.button().value
         is_control_pressed = event.modifiers().value == Qt.KeyboardModifier.ControlModifier.value
+        is_shift_pressed = event.modifiers().value == Qt.KeyboardModifier.ShiftModifier.value
+        is_alt_pressed = event.modifiers().value == Qt.KeyboardModifier.AltModifier.value
 
         if button == Qt.MouseButton.LeftButton.value and is_control_pressed:
             self.__current_action = ActionType.DELETE_REF_LINE
             return
 
+        if button == Qt.MouseButton.LeftButton.value and is_shift_pressed:
+            self.__current_action = ActionType.DRAG_COMPONENT
+            return
+
+        if button == Qt.MouseButton.LeftButton.value and is_alt_pressed:
+            self.__current_action = ActionType.HIGHLIGHT_COMPONENT
+            return
+
         if button == Qt.MouseButton.LeftButton.value:
             self.__current_action = ActionType.DRAG_RECT
             return
@@ -219,3 +486,4 @@ class Scene:
         self.__current_action = None
         self.__current_line_id = None
         self.__current_rect_data = None
+        self.__current_component = frozenset()
@@ -0,0 +1,227 @@
+import argparse
+from collections import deque
+from random import Random
+from typing import Dict, List, Set, Tuple
+
+from PyQt6.QtCore import QPoint, QRect
+
+import constants as const
+from connectivity import ConnectivityIndex
+from custom_types import BoxT, RectSnapshotT
+from persistent_map import PersistentMap
+from persistent_quad_tree import PersistentQuadTree, boxes_intersect, get_box
+from scene import Scene
+from snapshot import SceneSnapshot
+
+
+class CollidingKey:
+    """Key with only a few possible hashes, so different keys have to share leaves of the trie"""
+    def __init__(self, value: int):
+        self.value = value
+
+    def __hash__(self) -> int:
+        return self.value % 7
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, CollidingKey) and other.value == self.value
+
+
+def check_persistent_map(random: Random, steps: int) -> None:
+    """Applies random changes to the map and to a plain dict and compares them, old versions must stay untouched"""
+    keys: List[object] = [*range(200), *map(CollidingKey, range(50)), *(f"key-{i}" for i in range(50))]
+
+    persistent_map: PersistentMap[object, int] = PersistentMap()
+    expected: Dict[object, int] = {}
+    versions: List[Tuple[PersistentMap[object, int], Dict[object, int]]] = []
+
+    for step in range(steps):
+        key = keys[random.randrange(len(keys))]
+
+        if random.random() < 0.6:
+            persistent_map = persistent_map.set(key, step)
+            expected[key] = step
+        else:
+            persistent_map = persistent_map.remove(key)
+            expected.pop(key, None)
+
+        assert len(persistent_map) == len(expected), (len(persistent_map), len(expected))
+        assert persistent_map.get(key) == expected.get(key), key
+        assert (key in persistent_map) == (key in expected), key
+
+        if step % 100 == 0:
+            versions.append((persistent_map, dict(expected)))
+
+    for old_map, old_expected in versions:
+        assert dict(old_map.items()) == old_expected
+        assert all(old_map.get(key) == old_expected.get(key) for key in keys)
+
+    print("persistent map check passed")
+
+
+def check_persistent_quad_tree(random: Random, steps: int) -> None:
+    """Applies random changes to the tree and compares its queries with a brute force search"""
+    boundary: BoxT = (0, 0, 500, 300)
+
+    # entries are always inside the boundary like rectangles inside the window
+    def random_entry(rect_id: str) -> RectSnapshotT:
+        width, height = random.randrange(1, 60), random.randrange(1, 60)
+        x, y = random.randrange(boundary[2] - width), random.randrange(boundary[3] - height)
+
+        return RectSnapshotT(rect_id, x, y, width, height, 0)
+
+    def random_box() -> BoxT:
+        x, y = random.randrange(-50, boundary[2]), random.randrange(-50, boundary[3])
+
+        return x, y, random.randrange(0, 200), random.randrange(0, 200)
+
+    def brute_force_query(entries: Dict[str, RectSnapshotT], range_box: BoxT) -> List[str]:
+        return sorted(entry.id for entry in entries.values() if boxes_intersect(range_box, get_box(entry)))
+
+    qtree = PersistentQuadTree.empty(boundary, 4)
+    expected: Dict[str, RectSnapshotT] = {}
+    versions: List[Tuple[PersistentQuadTree, Dict[str, RectSnapshotT]]] = []
+
+    for step in range(steps):
+        rect_id = f"rect-{random.randrange(100)}"
+        old_entry = expected.get(rect_id)
+
+        if old_entry is None:
+            entry = random_entry(rect_id)
+            qtree = qtree.insert(entry)
+            expected[rect_id] = entry
+        elif random.random() < 0.7:
+            entry = random_entry(rect_id)
+            qtree = qtree.update(old_entry, entry)
+            expected[rect_id] = entry
+        else:
+            qtree = qtree.delete(old_entry)
+            expected.pop(rect_id)
+
+        range_box = random_box()
+        found = sorted(entry.id for entry in qtree.query(range_box))
+        assert found == brute_force_query(expected, range_box), (step, range_box)
+
+        if step % 100 == 0:
+            versions.append((qtree, dict(expected)))
+
+    for old_qtree, old_expected in versions:
+        range_box = random_box()
+        assert sorted(entry.id for entry in old_qtree.query(range_box)) == brute_force_query(old_expected, range_box)
+
+    print("persistent quad tree check passed")
+
+
+def check_snapshot(random: Random, steps: int) -> None:
+    """Edits the scene randomly and compares snapshots with the live scene, old snapshots must stay untouched"""
+    scene = Scene(const.WINDOW_WIDTH, const.WINDOW_HEIGHT)
+    line_ids: List[str] = []
+    versions: List[Tuple[SceneSnapshot, List[RectSnapshotT]]] = []
+
+    def random_point() -> QPoint:
+        return QPoint(random.randrange(const.WINDOW_WIDTH), random.randrange(const.WINDOW_HEIGHT))
+
+    def random_rect_id() -> str:
+        rectangles = scene.rectangles
+        return rectangles[random.randrange(len(rectangles))]["id"]
+
+    for step in range(steps):
+        kind = random.random()
+
+        if kind < 0.2 or len(scene.rectangles) < 2:
+            scene.create_rect(random_point())
+        elif kind < 0.6:
+            scene.move_rect(random_rect_id(), random_point())
+        elif kind < 0.7:
+            scene.move_component(random_rect_id(), random_point())
+        elif kind < 0.9:
+            line_id = scene.link_rects(random_rect_id(), random_rect_id())
+
+            if line_id is not None:
+                line_ids.append(line_id)
+        elif line_ids:
+            scene.unlink_rects(line_ids.pop(random.randrange(len(line_ids))))
+
+        # moved rectangles are updated into the tree in batches like commands of the server
+        if step % 7 == 0:
+            scene.update_index()
+
+        if step % 10 != 0:
+            continue
+
+        snapshot = scene.take_snapshot()
+        range_point = random_point()
+        range_rect = QRect(range_point.x(), range_point.y(), random.randrange(400), random.randrange(400))
+
+        found = sorted(entry.id for entry in snapshot.query(range_rect))
+        assert found == sorted(rect["id"] for rect in scene.query_region(range_rect)), (step, range_rect)
+        assert sorted(line.id for line in snapshot.reference_lines) == sorted(scene.reference_lines.keys())
+
+        versions.append((snapshot, sorted(snapshot.rectangles)))
+
+    for old_snapshot, old_rectangles in versions:
+        assert sorted(old_snapshot.rectangles) == old_rectangles, old_snapshot.version
+
+    print("snapshot check passed")
+
+
+def check_connectivity(random: Random, steps: int) -> None:
+    """Links and unlinks random rectangles and compares components with a breadth-first search over all links"""
+    index = ConnectivityIndex()
+    rect_ids: List[str] = []
+    links: List[Tuple[str, str]] = []
+
+    def find_component(rect_id: str) -> Set[str]:
+        neighbours: Dict[str, List[str]] = {}
+
+        for first_rect_id, second_rect_id in links:
+            neighbours.setdefault(first_rect_id, []).append(second_rect_id)
+            neighbours.setdefault(second_rect_id, []).append(first_rect_id)
+
+        visited = {rect_id}
+        queue = deque([rect_id])
+
+        while queue:
+            for linked_rect_id in neighbours.get(queue.popleft(), []):
+                if linked_rect_id not in visited:
+                    visited.add(linked_rect_id)
+                    queue.append(linked_rect_id)
+
+        return visited
+
+    for step in range(steps):
+        kind = random.random()
+
+        if kind < 0.1 or len(rect_ids) < 2:
+            rect_id = f"rect-{len(rect_ids)}"
+            index.add_rect(rect_id)
+            rect_ids.append(rect_id)
+        elif kind < 0.6:
+            # the same pair can be linked several times like with several lines between rectangles
+            first_rect_id, second_rect_id = random.sample(rect_ids, 2)
+            index.link(first_rect_id, second_rect_id)
+            links.append((first_rect_id, second_rect_id))
+        elif links:
+            index.unlink(*links.pop(random.randrange(len(links))))
+
+        rect_id = rect_ids[random.randrange(len(rect_ids))]
+        component = find_component(rect_id)
+        assert index.get_component(rect_id) == component, (step, rect_id)
+
+        other_rect_id = rect_ids[random.randrange(len(rect_ids))]
+        is_linked = other_rect_id in component
+        assert index.is_connected(rect_id, other_rect_id) == is_linked, (step, other_rect_id)
+        assert (index.get_component_id(rect_id) == index.get_component_id(other_rect_id)) == is_linked, step
+
+    print("connectivity check passed")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Randomized checks of scene data structures against simple models")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random generator")
+    parser.add_argument("--steps", type=int, default=3000, help="amount of random changes in every check")
+    args = parser.parse_args()
+
+    check_persistent_map(Random(args.seed), args.steps)
+    check_persistent_quad_tree(Random(args.seed), args.steps)
+    check_snapshot(Random(args.seed), args.steps)
+    check_connectivity(Random(args.seed), args.steps)
@@ -0,0 +1,125 @@
+from typing import Dict, Iterable, List, Optional
+
+from PyQt6.QtCore import QRect
+
+from custom_types import RectDataT, ReferenceLineT, RectSnapshotT, ReferenceLineSnapshotT
+from persistent_map import PersistentMap
+from persistent_quad_tree import PersistentQuadTree
+
+
+def make_rect_snapshot(rect_data: RectDataT) -> RectSnapshotT:
+    """Copies mutable rectangle data into an immutable record"""
+    rect = rect_data["rect"]
+
+    return RectSnapshotT(
+        rect_data["id"],
+        rect.x(),
+        rect.y(),
+        rect.width(),
+        rect.height(),
+        rect_data["color"].rgba(),
+    )
+
+
+def make_line_snapshot(line: ReferenceLineT) -> Optional[ReferenceLineSnapshotT]:
+    """Copies mutable reference line into an immutable record, lines which are not linked yet are skipped"""
+    start_point, end_point = line["start_point"], line["end_point"]
+    first_rect_id, second_rect_id = line["first_rect_id"], line["second_rect_id"]
+
+    if start_point is None or end_point is None or first_rect_id is None or second_rect_id is None:
+        return None
+
+    return ReferenceLineSnapshotT(
+        line["id"],
+        first_rect_id,
+        second_rect_id,
+        start_point.x(),
+        start_point.y(),
+        end_point.x(),
+        end_point.y(),
+    )
+
+
+class SceneSnapshot:
+    """
+    Immutable point-in-time state of the scene.
+    Snapshot never changes after creation so it can be read from any number of threads without locking
+    """
+    __slots__ = ("__version", "__qtree", "__rectangles", "__reference_lines")
+
+    def __init__(
+        self,
+        version: int,
+        qtree: PersistentQuadTree,
+        rectangles: PersistentMap[str, RectSnapshotT],
+        reference_lines: PersistentMap[str, ReferenceLineSnapshotT]
+    ):
+        self.__version = version
+        self.__qtree = qtree
+        self.__rectangles = rectangles
+        self.__reference_lines = reference_lines
+
+    @classmethod
+    def empty(cls, width: int, height: int, capacity: int) -> "SceneSnapshot":
+        return cls(0, PersistentQuadTree.empty((0, 0, width, height), capacity), PersistentMap(), PersistentMap())
+
+    @property
+    def version(self) -> int:
+        return self.__version
+
+    @property
+    def rectangles(self) -> List[RectSnapshotT]:
+        return list(self.__rectangles.values())
+
+    @property
+    def reference_lines(self) -> List[ReferenceLineSnapshotT]:
+        return list(self.__reference_lines.values())
+
+    def get_rect(self, rect_id: str) -> Optional[RectSnapshotT]:
+        return self.__rectangles.get(rect_id)
+
+    def get_reference_line(self, line_id: str) -> Optional[ReferenceLineSnapshotT]:
+        return self.__reference_lines.get(line_id)
+
+    def query(self, range_rect: QRect) -> List[RectSnapshotT]:
+        """Finds all rectangles which intersect given rectangle"""
+        return self.__qtree.query((range_rect.x(), range_rect.y(), range_rect.width(), range_rect.height()))
+
+    def apply(
+        self,
+        changed_rects: Iterable[RectDataT],
+        changed_lines: Dict[str, Optional[ReferenceLineT]]
+    ) -> "SceneSnapshot":
+        """
+        Creates the next version of the snapshot, the cost depends only on the amount of changes
+
+        :param changed_rects: rectangles created or moved since this snapshot
+        :param changed_lines: reference lines changed since this snapshot, None value means the line was deleted
+        """
+        qtree = self.__qtree
+        rectangles = self.__rectangles
+        reference_lines = self.__reference_lines
+
+        for rect_data in changed_rects:
+            entry = make_rect_snapshot(rect_data)
+            old_entry = rectangles.get(entry.id)
+
+            if old_entry == entry:
+                continue
+
+            if old_entry is None:
+                qtree = qtree.insert(entry)
+            else:
+                qtree = qtree.update(old_entry, entry)
+
+            rectangles = rectangles.set(entry.id, entry)
+
+        for line_id, line in changed_lines.items():
+            line_entry = make_line_snapshot(line) if line is not None else None
+
+            if line_entry is None:
+                reference_lines = reference_lines.remove(line_id)
+            elif reference_lines.get(line_id) != line_entry:
+                reference_lines = reference_lines.set(line_id, line_entry)
+
+        return SceneSnapshot(self.__version + 1, qtree, rectangles, reference_lines)
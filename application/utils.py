@@ -1,4 +1,5 @@
 from datetime import datetime
+from itertools import count
 from random import randrange
 from typing import Optional, List, Literal, Union
 
@@ -9,9 +10,13 @@ from constants import WINDOW_WIDTH, WINDOW_HEIGHT, RECT_WIDTH, RECT_HEIGHT, POIN
 from PyQt6.QtCore import QPoint, QRect
 
 
+# sequence number makes ids unique when several ids are generated within the same timestamp
+id_sequence = count()
+
+
 def generate_random_id() -> str:
     """Generates random id based on timestamp"""
-    return str(datetime.now().timestamp())
+    return f"{datetime.now().timestamp()}-{next(id_sequence)}"
 
 
 def generate_random_color() -> QColor:
@@ -62,6 +67,19 @@ def calculate_rect_delta(current_point: QPoint, previous_point: QPoint) -> tuple
     return dx, dy
 
 
+def clamp_delta_to_window(rects: List[QRect], dx: int, dy: int) -> tuple[int, int]:
+    """Limits the movement vector so that all rectangles moved by it stay inside the application window"""
+    left = min(rect.x() for rect in rects)
+    top = min(rect.y() for rect in rects)
+    right = max(rect.x() + rect.width() for rect in rects)
+    bottom = max(rect.y() + rect.height() for rect in rects)
+
+    dx = max(-left, min(dx, WINDOW_WIDTH - right))
+    dy = max(-top, min(dy, WINDOW_HEIGHT - bottom))
+
+    return dx, dy
+
+
 def get_key_of_point(rect_id: str, line: ReferenceLineT) -> Union[Literal["start_point"], Literal["end_point"]]:
     """Defines which key of point should be chosen based on rectangle id"""
     if line["first_rect_id"] == rect_id: